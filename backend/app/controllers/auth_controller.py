@@ -1,4 +1,8 @@
+import hashlib
+import hmac
 import secrets
+import time
+from collections import OrderedDict
 from fastapi import HTTPException, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .config_controller import ConfigManager
@@ -10,9 +14,17 @@ security = HTTPBearer(auto_error=False)
 
 class AuthHandler:
     _instance = None
+    _CACHE_TTL = 30  # Seconds a validated token is trusted without re-checking
+    _CACHE_MAX = 4096
+    _TOKEN_MAX = 1024  # Oldest sessions are evicted beyond this
+    _TOKEN_IDLE_TTL = 7 * 24 * 3600  # Seconds a session may sit unused
     
     def __init__(self):
-        self._tokens = set() # Simple in-memory token store
+        # In-memory token store: token -> last-seen time (LRU order)
+        self._tokens: OrderedDict[str, float] = OrderedDict()
+        # Recently validated token digests -> validation time (LRU order)
+        self._valid_cache: OrderedDict[bytes, float] = OrderedDict()
+        self._cfg = ConfigManager.get_instance()
     
     @classmethod
     def get_instance(cls):
@@ -22,29 +34,35 @@ class AuthHandler:
 
     def verify_password(self, password: str) -> bool:
         """Verify the provided password against config."""
-        config_pass = ConfigManager.get_instance().panel_password
-        if not config_pass:
+        pw_bytes = self._cfg._panel_password_bytes
+        if not pw_bytes:
             # If no password set, always allow? 
             # Or should we disable login endpoint if no password?
             # User wants to "set access password", so if set, verify.
             return True
             
-        # Constant time comparison not strictly necessary for this scale but good practice
-        return password == config_pass
+        return hmac.compare_digest(password.encode("utf-8"), pw_bytes)
 
     def create_token(self) -> str:
         """Generate a session token."""
         token = secrets.token_hex(32)
-        self._tokens.add(token)
+        self._tokens[token] = time.monotonic()
+        while len(self._tokens) > self._TOKEN_MAX:
+            evicted, _ = self._tokens.popitem(last=False)
+            self._valid_cache.pop(self._hash_token(evicted), None)
         return token
 
+    @staticmethod
+    def _hash_token(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
     def revoke_token(self, token: str):
-        if token in self._tokens:
-            self._tokens.remove(token)
+        self._tokens.pop(token, None)
+        self._valid_cache.pop(self._hash_token(token), None)
 
     async def get_current_user(self, request: Request, creds: HTTPAuthorizationCredentials = Security(security)):
         """Dependency for protected endpoints."""
-        config_pass = ConfigManager.get_instance().panel_password
+        config_pass = self._cfg.panel_password
         
         # If no password configured, authentication is disabled
         if not config_pass:
@@ -56,7 +74,23 @@ class AuthHandler:
              raise HTTPException(status_code=401, detail="Not authenticated")
 
         token = creds.credentials
-        if token not in self._tokens:
+        key = self._hash_token(token)
+        now = time.monotonic()
+        cached = self._valid_cache.get(key)
+        if cached is not None and now - cached < self._CACHE_TTL:
+            return "admin"
+
+        last_seen = self._tokens.get(token)
+        if last_seen is None or now - last_seen > self._TOKEN_IDLE_TTL:
+            self._tokens.pop(token, None)
+            self._valid_cache.pop(key, None)
             raise HTTPException(status_code=401, detail="Invalid token")
+
+        self._tokens[token] = now
+        self._tokens.move_to_end(token)
+        self._valid_cache[key] = now
+        self._valid_cache.move_to_end(key)
+        if len(self._valid_cache) > self._CACHE_MAX:
+            self._valid_cache.popitem(last=False)
             
         return "admin"
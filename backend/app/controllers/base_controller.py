@@ -1,27 +1,99 @@
 import asyncio
 import logging
-import json
 import os
+import shlex
+import socket
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Union, List
+from typing import Dict, Optional, Tuple, Union, List
+
+import httpx
+import orjson
+from httpx_socks import AsyncProxyTransport
+
+from ..utils.supervisor import SupervisorClient
 
 logger = logging.getLogger(__name__)
 
+
+def _probe_port(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.2)
+        return s.connect_ex(("127.0.0.1", port)) == 0
+
+
+def read_small_file(path: str, size_hint: int = 65536) -> str:
+    """Read a small text file with raw os.read calls (no TextIOWrapper)"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, max(size_hint, 4096))
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks).decode("utf-8")
+
+
+# asyncio.timeout (3.11+) arms a single loop timer; wait_for wraps the awaitable in a task
+_asyncio_timeout = getattr(asyncio, "timeout", None)
+
+
+async def communicate_with_timeout(process: asyncio.subprocess.Process, timeout: Optional[float]):
+    """process.communicate() bounded by timeout; raises asyncio.TimeoutError like wait_for"""
+    if timeout is None:
+        return await process.communicate()
+    if _asyncio_timeout is not None:
+        async with _asyncio_timeout(timeout):
+            return await process.communicate()
+    return await asyncio.wait_for(process.communicate(), timeout=timeout)
+
+
+async def is_port_open(port: int) -> bool:
+    """Check if something listens on loopback:port (in-process connect, no subprocess)"""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _probe_port, port)
+    except Exception:
+        return False
+
+
 class WarpBackendController(ABC):
     """
     Abstract base class for WARP backend controllers.
     Implements common functionality for process management, network checks, and status retrieval.
     """
     
-    _status_cache: Optional[Dict] = None
-    _status_cache_time: float = 0
     _STATUS_CACHE_TTL: float = 2.0
+    _CONN_TTL: float = 0.5
+    _STATUS_REUSE_TTL: float = 1.0
+    # IP info APIs and the name of the parser for each response
+    _IP_APIS = (
+        ("http://ip-api.com/json/?fields=status,message,query,country,city,isp", "_parse_ipapi"),
+        ("https://ipinfo.io/json", "_parse_ipinfo"),
+        ("https://ifconfig.me/all.json", "_parse_ifconfig"),
+    )
 
     def __init__(self, socks5_port: int = 1080):
         self.socks5_port = socks5_port
         self._cached_ip_info: Optional[Dict] = None
         self._cache_time: float = 0
         self._cache_ttl: float = 120  # Cache IP info for 120 seconds
+        # Per-instance status cache; concurrent misses share one in-flight probe
+        self._status_cache: Optional[Dict] = None
+        self._status_cache_time: float = 0.0
+        self._status_inflight: Optional[asyncio.Future] = None
+        self._conn_cache: Optional[Tuple[bool, float]] = None
+        self._inflight_ip: Optional[asyncio.Future] = None
+        # Set by subclasses after a connect/disconnect action to wake wait_for_status early
+        self._state_event = asyncio.Event()
+        self._supervisor = SupervisorClient.get_instance()
+        # Persistent client for IP lookups through the local SOCKS5 proxy
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_port: Optional[int] = None
+        # Parser dispatch resolved once instead of substring-matching the URL per response
+        self._ip_parsers = tuple((url, getattr(self, name)) for url, name in self._IP_APIS)
 
     @property
     @abstractmethod
@@ -44,62 +116,156 @@ class WarpBackendController(ABC):
         """Check if backend is connected"""
         pass
 
-    async def _run_command(self, command: Union[str, List[str]], timeout=None):
-        """Run a shell command or executable"""
+    async def _run_command(self, command: Union[str, List[str]], timeout=None, decode: bool = True):
+        """
+        Run an executable. A string command is split shell-style but executed
+        directly (no /bin/sh); callers that need a shell pass ["/bin/sh", "-c", ...].
+        With decode=False stdout/stderr are returned as raw bytes (for callers that only check rc).
+        """
+        process = None
         try:
-            if isinstance(command, list):
-                process = await asyncio.create_subprocess_exec(
-                    *command,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-            else:
-                process = await asyncio.create_subprocess_shell(
-                    command,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-            return process.returncode, stdout.decode().strip(), stderr.decode().strip()
+            argv = shlex.split(command) if isinstance(command, str) else command
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await communicate_with_timeout(process, timeout)
+            if not decode:
+                return process.returncode, stdout, stderr
+            return (
+                process.returncode,
+                stdout.decode("utf-8", "replace").strip(),
+                stderr.decode("utf-8", "replace").strip(),
+            )
         except asyncio.TimeoutError:
             logger.error(f"Command '{command}' timed out")
-            return -1, "", "Timeout"
+            # The timeout only cancels communicate(); kill and reap the child so it
+            # doesn't linger as a zombie holding its pipes open
+            if process is not None and process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            return -1, ("" if decode else b""), ("Timeout" if decode else b"Timeout")
         except Exception as e:
             logger.error(f"Error executing '{command}': {e}")
-            return -1, "", str(e)
+            return -1, ("" if decode else b""), (str(e) if decode else str(e).encode())
+
+    async def _supervisorctl(self, action: str, name: Optional[str] = None) -> Tuple[int, str]:
+        """
+        Run a supervisorctl action (start/stop/restart/status/reread/update) over the persistent
+        XML-RPC connection; falls back to the supervisorctl CLI if the socket is absent.
+        """
+        if self._supervisor.available:
+            return await self._supervisor.call(action, name)
+        command = ["supervisorctl", action, name] if name else ["supervisorctl", action]
+        rc, stdout, _ = await self._run_command(command)
+        return rc, stdout
 
     async def _is_port_open(self, port: int) -> bool:
-        """Check if a local port is listening using 'ss'"""
-        try:
-            rc, stdout, _ = await self._run_command(f"ss -lnt sport = :{port}")
-            return f":{port}" in stdout
-        except Exception:
-            return False
+        """Check if a local port is listening"""
+        return await is_port_open(port)
+
+    async def _wait_until(self, predicate, timeout: float, initial_delay: float = 0.025,
+                          max_delay: float = 0.5) -> bool:
+        """
+        Await predicate() until it returns True or timeout elapses.
+        Retries with exponential backoff so readiness is noticed within tens of ms
+        instead of a fixed 1 s polling quantum.
+        """
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        while True:
+            if await predicate():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 1.5, max_delay)
+
+    async def _wait_port_open(self, port: int, total_timeout: float) -> bool:
+        """Wait for a local port to start listening"""
+        return await self._wait_until(lambda: self._is_port_open(port), total_timeout)
+
+    async def _wait_port_closed(self, port: int, total_timeout: float) -> bool:
+        """Wait for a local port to stop listening"""
+        async def _closed() -> bool:
+            return not await self._is_port_open(port)
+        return await self._wait_until(_closed, total_timeout)
 
     async def get_status(self) -> Dict:
         """Get connection status and IP information (with short-term caching)"""
-        now = asyncio.get_running_loop().time()
-        if (
-            self._status_cache is not None
-            and now - self._status_cache_time < self._STATUS_CACHE_TTL
-        ):
+        if self._status_cache_fresh():
             return self._status_cache
 
-        status = await self._get_status_uncached()
-        self._status_cache = status
-        self._status_cache_time = now
-        return status
+        inflight = self._status_inflight
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The caller doing the probe was cancelled; take over
+                return await self.get_status()
+
+        future = asyncio.get_running_loop().create_future()
+        self._status_inflight = future
+        try:
+            status = await self._get_status_uncached()
+            self._status_cache = status
+            self._status_cache_time = time.monotonic()
+            future.set_result(status)
+            return status
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Consume the exception so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            self._status_inflight = None
+
+    def _status_cache_fresh(self) -> bool:
+        return (
+            self._status_cache is not None
+            and time.monotonic() - self._status_cache_time < self._STATUS_CACHE_TTL
+        )
 
     def _invalidate_status_cache(self):
         self._status_cache = None
         self._status_cache_time = 0
+        self._conn_cache = None
+
+    def _signal_state_change(self):
+        """Notify waiters that the connection state may have changed"""
+        # Drops the status too: is_connected_cached() would otherwise answer from it
+        self._invalidate_status_cache()
+        self._state_event.set()
+
+    async def is_connected_cached(self) -> bool:
+        """is_connected() with a short TTL so back-to-back callers share one probe"""
+        now = time.monotonic()
+        if self._conn_cache is not None and now - self._conn_cache[1] < self._CONN_TTL:
+            return self._conn_cache[0]
+        # A status built within the last second already answers the question
+        if self._status_cache is not None and now - self._status_cache_time < self._STATUS_REUSE_TTL:
+            return self._status_cache.get("status") == "connected"
+
+        connected = await self.is_connected()
+        self._conn_cache = (connected, time.monotonic())
+        return connected
 
     async def _get_status_uncached(self) -> Dict:
         """
         Construct status dictionary. 
         Subclasses can override, but this provides a solid default structure.
         """
-        connected = await self.is_connected()
+        connected = await self.is_connected_cached()
         
         base_status = {
             "backend": self.__class__.__name__.replace("Controller", "").lower(), # efficient enough
@@ -121,12 +287,12 @@ class WarpBackendController(ABC):
             self._cached_ip_info = None
             return base_status
 
-        now = asyncio.get_running_loop().time()
+        now = time.monotonic()
         if self._cached_ip_info and (now - self._cache_time) < self._cache_ttl:
             base_status.update(self._cached_ip_info)
             return base_status
 
-        ip_info = await self._fetch_ip_info()
+        ip_info = await self._fetch_ip_info_shared()
         if ip_info:
             self._cached_ip_info = ip_info
             self._cache_time = now
@@ -136,90 +302,163 @@ class WarpBackendController(ABC):
 
         return base_status
 
-    async def _fetch_ip_info(self) -> Optional[Dict]:
-        """Fetch IP info via SOCKS5 proxy"""
-        apis = [
-            "http://ip-api.com/json/?fields=status,message,query,country,city,isp",
-            "https://ipinfo.io/json",
-            "https://ifconfig.me/all.json"
-        ]
-        
-        for api_url in apis:
+    async def _fetch_ip_info_shared(self) -> Optional[Dict]:
+        """Single-flight wrapper: concurrent callers await one in-progress fetch"""
+        if self._inflight_ip is not None:
+            return await asyncio.shield(self._inflight_ip)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_ip = future
+        try:
+            result = await self._fetch_ip_info()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Followers fall back to the cached IP info instead of being cancelled
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Consume the exception so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            self._inflight_ip = None
+
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled SOCKS5 client, rebuilding it if the proxy port changed"""
+        if self._http is not None and self._http_port == self.socks5_port:
+            return self._http
+
+        await self._close_http_client()
+        transport = AsyncProxyTransport.from_url(
+            f"socks5://127.0.0.1:{self.socks5_port}", rdns=True
+        )
+        self._http = httpx.AsyncClient(transport=transport, timeout=5.0)
+        self._http_port = self.socks5_port
+        return self._http
+
+    async def _close_http_client(self):
+        if self._http is not None:
             try:
-                cmd = ["curl", "-s", "--max-time", "5"]
-                
-                # Always use proxy for IP check to verify tunnel
-                cmd.extend(["-x", f"socks5h://127.0.0.1:{self.socks5_port}"])
-                cmd.append(api_url)
-                
-                # logger.debug(f"Fetching IP info from {api_url}...")
-                rc, stdout, _ = await self._run_command(cmd, timeout=8)
-
-                if rc == 0 and stdout:
-                    try:
-                        data = json.loads(stdout)
-                        return self._parse_ip_data(data, api_url)
-                    except json.JSONDecodeError:
-                        continue
-                        
+                await self._http.aclose()
             except Exception:
                 pass
-                
+        self._http = None
+        self._http_port = None
+
+    async def _fetch_ip_info(self) -> Optional[Dict]:
+        """Fetch IP info via SOCKS5 proxy (all APIs raced, first good answer wins)"""
+        client = await self._get_http_client()
+        tasks = [
+            asyncio.create_task(self._fetch_one(client, url, parser))
+            for url, parser in self._ip_parsers
+        ]
+        pending = set(tasks)
+        deadline = time.monotonic() + 8
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and task.result():
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return None
+
+    async def _fetch_one(self, client: httpx.AsyncClient, api_url: str, parser) -> Optional[Dict]:
+        """Query a single IP info API; returns None on any failure"""
+        try:
+            # Always use proxy for IP check to verify tunnel
+            resp = await client.get(api_url)
+            if resp.status_code == 200 and resp.content:
+                return parser(orjson.loads(resp.content)) or None
+        except Exception:
+            pass
         return None
 
-    def _parse_ip_data(self, data: Dict, api_url: str) -> Dict:
-        """Normalize IP data from different APIs"""
-        if "ip-api.com" in api_url:
-            if data.get("status") == "success":
-                isp = data.get("isp") or "Cloudflare WARP"
-                return {
-                    "ip": data.get("query") or "Unknown",
-                    "country": data.get("country") or "Unknown",
-                    "city": data.get("city") or "Unknown",
-                    "location": data.get("country") or "Unknown",
-                    "isp": isp,
-                    "details": {"isp": isp},
-                }
-        elif "ipinfo.io" in api_url:
-            return {
-                "ip": data.get("ip") or "Unknown",
-                "country": data.get("country") or "Unknown",
-                "city": data.get("city") or "Unknown",
-                "location": data.get("country") or "Unknown",
-                "isp": data.get("org") or "Cloudflare WARP",
-                "details": {"isp": data.get("org")},
-            }
-        elif "ifconfig.me" in api_url:
-             return {
-                "ip": data.get("ip_addr") or "Unknown",
-                "country": "Unknown",
-                "city": "Unknown",
-                "location": "Unknown",
-                "isp": "Cloudflare WARP",
-                "details": {},
-            }
-        return {}
+    # Normalize IP data from the different APIs
+
+    def _parse_ipapi(self, data: Dict) -> Dict:
+        if data.get("status") != "success":
+            return {}
+        isp = data.get("isp") or "Cloudflare WARP"
+        return {
+            "ip": data.get("query") or "Unknown",
+            "country": data.get("country") or "Unknown",
+            "city": data.get("city") or "Unknown",
+            "location": data.get("country") or "Unknown",
+            "isp": isp,
+            "details": {"isp": isp},
+        }
+
+    def _parse_ipinfo(self, data: Dict) -> Dict:
+        return {
+            "ip": data.get("ip") or "Unknown",
+            "country": data.get("country") or "Unknown",
+            "city": data.get("city") or "Unknown",
+            "location": data.get("country") or "Unknown",
+            "isp": data.get("org") or "Cloudflare WARP",
+            "details": {"isp": data.get("org")},
+        }
+
+    def _parse_ifconfig(self, data: Dict) -> Dict:
+        return {
+            "ip": data.get("ip_addr") or "Unknown",
+            "country": "Unknown",
+            "city": "Unknown",
+            "location": "Unknown",
+            "isp": "Cloudflare WARP",
+            "details": {},
+        }
 
     async def wait_for_status(self, target_status: str, timeout: int = 15) -> bool:
-        """Poll for status change"""
-        start_time = asyncio.get_running_loop().time()
-        while asyncio.get_running_loop().time() - start_time < timeout:
-            connected = await self.is_connected()
+        """
+        Wait for status change. Wakes on _signal_state_change(), falling back to
+        a re-probe (100 ms backing off to 1 s) for transitions nobody signals
+        (e.g. tunnel coming up).
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.1
+        fresh = False
+        while True:
+            self._state_event.clear()
+            if fresh:
+                # Re-probes bypass the connection/daemon caches, which would otherwise
+                # answer every wake-up inside their TTL with the pre-transition state
+                self._invalidate_status_cache()
+                connected = await self.is_connected()
+            else:
+                connected = await self.is_connected_cached()
+                fresh = True
             if target_status == "connected" and connected:
                 self._invalidate_status_cache()
                 return True
             elif target_status == "disconnected" and not connected:
                 self._invalidate_status_cache()
                 return True
-            await asyncio.sleep(1)
-        return False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._state_event.wait(), timeout=min(delay, remaining))
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 1.5, 1.0)
 
     async def rotate_ip_simple(self) -> bool:
         """Rotate IP by reconnecting (default implementation)"""
         logger.info(f"Rotating IP ({self.__class__.__name__}: disconnect + reconnect)...")
         await self.disconnect()
         await self.wait_for_status("disconnected", timeout=5)
-        await asyncio.sleep(2)
         if await self.connect():
             return await self.wait_for_status("connected", timeout=15)
         return False
@@ -1,12 +1,21 @@
-import json
+import atexit
+import orjson
 import os
 import logging
+import threading
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 class ConfigManager:
     _instance = None
+    _SAVE_DELAY = 0.1  # Seconds to coalesce bursts of set() calls into one write
+    # Keys coerced to a fixed type once (on load/set) so accessors skip conversion
+    _TYPED_KEYS = {
+        "socks5_port": (int, 1080),
+        "panel_port": (int, 8000),
+        "panel_password": (str, ""),
+    }
     
     def __init__(self):
         # Allow overriding via env (useful for docker vs local dev)
@@ -19,6 +28,15 @@ class ConfigManager:
             "panel_password": "",  # Empty means disabled/no auth
 
         }
+        self._panel_password: str = ""  # Memoized panel_password
+        self._panel_password_bytes: bytes = b""
+
+        # Debounced persistence: set() marks dirty and (re)arms a short timer
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        atexit.register(self.flush)
+
         self.load()
 
     @classmethod
@@ -31,8 +49,8 @@ class ConfigManager:
         """Load configuration from disk."""
         if os.path.exists(self._config_file):
             try:
-                with open(self._config_file, "r") as f:
-                    data = json.load(f)
+                with open(self._config_file, "rb") as f:
+                    data = orjson.loads(f.read())
                     self._config.update(data)
                 logger.info(f"Configuration loaded from {self._config_file}")
             except Exception as e:
@@ -44,35 +62,81 @@ class ConfigManager:
             if env_pass:
                 self._config["panel_password"] = env_pass
                 self.save() # Save it so it persists
+        for key in self._TYPED_KEYS:
+            self._config[key] = self._coerce(key, self._config.get(key))
+        self._refresh_password_cache()
 
     def save(self):
-        """Save configuration to disk."""
+        """Save configuration to disk (atomically via a temp file + rename)."""
         try:
             os.makedirs(os.path.dirname(self._config_file), exist_ok=True)
-            with open(self._config_file, "w") as f:
-                json.dump(self._config, f, indent=4)
+            tmp_path = f"{self._config_file}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(dict(self._config), option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, self._config_file)
             logger.info(f"Configuration saved to {self._config_file}")
         except Exception as e:
             logger.error(f"Failed to save configuration: {e}")
 
+    def _schedule_save(self):
+        """Coalesce rapid successive mutations into a single write."""
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self._SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk immediately, if any."""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            self.save()
+
+    def _refresh_password_cache(self):
+        """Recompute the memoized password string and its encoded bytes."""
+        self._panel_password = self._config["panel_password"]
+        self._panel_password_bytes = self._panel_password.encode("utf-8")
+
+    def _coerce(self, key: str, value):
+        """Convert a typed key's value, falling back to its default if invalid."""
+        typ, default = self._TYPED_KEYS[key]
+        if value is None:
+            return default
+        try:
+            return typ(value)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid value for {key}: {value!r}, using default {default!r}")
+            return default
+
     def get(self, key: str, default=None):
         return self._config.get(key, default)
 
     def set(self, key: str, value):
+        if key in self._TYPED_KEYS:
+            value = self._coerce(key, value)
         self._config[key] = value
-        self.save()
+        if key == "panel_password":
+            self._refresh_password_cache()
+        self._schedule_save()
 
     # Convenience accessors
     @property
     def socks5_port(self) -> int:
-        return int(self._config.get("socks5_port", 1080))
+        return self._config["socks5_port"]
 
     @property
     def panel_port(self) -> int:
-        return int(self._config.get("panel_port", 8000))
+        return self._config["panel_port"]
 
     @property
     def panel_password(self) -> str:
-        return self._config.get("panel_password", "")
+        return self._panel_password
         
 
@@ -1,20 +1,67 @@
 import os
+import asyncio
 import json
 import logging
 import shutil
 import subprocess
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 import platform
 import zipfile
 import stat
+import tempfile
 import re
-from typing import List, Optional, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Tuple
 from .config_controller import ConfigManager
 
 logger = logging.getLogger(__name__)
 
+_GH_HEADERS = {"Accept": "application/vnd.github+json", "User-Agent": "warppanel"}
+
+# Shared keep-alive session for GitHub API / release downloads
+_gh = requests.Session()
+_gh.headers.update(_GH_HEADERS)
+_gh.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+_USQUE_LATEST_URL = "https://api.github.com/repos/Diniboy1123/usque/releases/latest"
+
+# Kernel downloads/version probes get their own bounded pool so a slow update
+# can't starve the default executor (port probes, supervisor RPC, ...)
+_kernel_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="kernel-io")
+
+
+# Keep-alive client for update checks made on the event loop, created on first use
+_gh_async: Optional[httpx.AsyncClient] = None
+
+
+def _get_gh_async() -> httpx.AsyncClient:
+    global _gh_async
+    if _gh_async is None:
+        _gh_async = httpx.AsyncClient(headers=_GH_HEADERS, timeout=10)
+    return _gh_async
+
+
+async def close_gh_async():
+    """Close the update-check client (app shutdown)"""
+    global _gh_async
+    if _gh_async is not None:
+        client, _gh_async = _gh_async, None
+        await client.aclose()
+
+
+async def run_kernel_io(func, *args):
+    """Run a blocking KernelVersionManager call on the kernel pool"""
+    return await asyncio.get_running_loop().run_in_executor(_kernel_executor, func, *args)
+
+# Version patterns for `<binary> version` output
+_VER_LABELED = re.compile(r'version\s+v?(\d+\.\d+\.\d+)', re.IGNORECASE)
+_VER_BARE = re.compile(r'v?(\d+\.\d+\.\d+)')
+
 class KernelVersionManager:
     _instance = None
+    _VERSIONS_CACHE_TTL = 5.0  # Seconds
     
     def __init__(self):
         # Base directory for data
@@ -25,6 +72,16 @@ class KernelVersionManager:
         os.makedirs(self.kernels_dir, exist_ok=True)
         
         self.config_mgr = ConfigManager.get_instance()
+
+        # backend -> (versions, timestamp); backend -> resolved binary path
+        self._versions_cache: Dict[str, Tuple[List[str], float]] = {}
+        self._binary_path_cache: Dict[str, str] = {}
+        # (binary_path, mtime) -> `version` output; mtime changes on install/upgrade
+        self._version_probe_cache: Dict[Tuple[str, float], str] = {}
+        # backend -> (installed version info, timestamp)
+        self._info_cache: Dict[str, Tuple[Dict, float]] = {}
+        # ((warp-cli path, mtime_ns), `warp-cli --version` output)
+        self._official_version_cache: Optional[Tuple[Tuple[str, int], str]] = None
         
     @classmethod
     def get_instance(cls):
@@ -37,31 +94,58 @@ class KernelVersionManager:
         if backend == "official":
             return ["System Default"]
             
+        cached = self._versions_cache.get(backend)
+        if cached is not None and time.monotonic() - cached[1] < self._VERSIONS_CACHE_TTL:
+            return list(cached[0])
+
         backend_dir = os.path.join(self.kernels_dir, backend)
-        if not os.path.exists(backend_dir):
-            return []
-            
         versions = []
         try:
-            for entry in os.scandir(backend_dir):
-                if entry.is_dir() and not entry.name.startswith('.'):
-                    versions.append(entry.name)
+            # One pass over the directory; is_dir() uses d_type, so no stat per entry
+            with os.scandir(backend_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir() and not entry.name.startswith('.'):
+                        versions.append(entry.name)
+        except FileNotFoundError:
+            return []
         except Exception as e:
             logger.error(f"Error listing versions for {backend}: {e}")
-            
-        return sorted(versions, reverse=True)
+
+        versions.sort(reverse=True)
+        self._versions_cache[backend] = (versions, time.monotonic())
+        return list(versions)
+
+    def _invalidate_caches(self, backend: str):
+        """Drop cached version listing and binary path for a backend"""
+        self._versions_cache.pop(backend, None)
+        self._binary_path_cache.pop(backend, None)
+        self._info_cache.pop(backend, None)
 
     def get_active_version(self, backend: str) -> Optional[str]:
         """Get the currently selected version for a backend"""
         if backend == "official":
+            # The output only changes when the binary does, so key on its mtime
+            # instead of spawning warp-cli for every lookup
+            cli_path = shutil.which("warp-cli")
+            if not cli_path:
+                return "System Default"
+            try:
+                key = (cli_path, os.stat(cli_path).st_mtime_ns)
+            except OSError:
+                return "System Default"
+            cached = self._official_version_cache
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            version = "System Default"
             try:
                 # Try to get real version
-                result = subprocess.run(["warp-cli", "--version"], capture_output=True, text=True, timeout=2)
+                result = subprocess.run([cli_path, "--version"], capture_output=True, text=True, timeout=2)
                 if result.returncode == 0:
-                    return result.stdout.strip()
+                    version = result.stdout.strip()
             except:
                 pass
-            return "System Default"
+            self._official_version_cache = (key, version)
+            return version
         
         # Use ConfigManager
         return self.config_mgr.get(f"{backend}_version")
@@ -79,6 +163,7 @@ class KernelVersionManager:
             
         # Update config via manager
         self.config_mgr.set(f"{backend}_version", version)
+        self._invalidate_caches(backend)
         
         # Update symlink if on Linux and backend is usque
         if os.name == 'posix' and backend == 'usque':
@@ -104,6 +189,10 @@ class KernelVersionManager:
         """Get the executable path for the current backend version"""
         if backend == "official":
             return "warp-cli" # Use system path
+
+        cached = self._binary_path_cache.get(backend)
+        if cached is not None:
+            return cached
             
         active_version = self.get_active_version(backend)
         if not active_version:
@@ -117,15 +206,44 @@ class KernelVersionManager:
         binary_path = os.path.join(self.kernels_dir, backend, active_version, binary_name)
         
         if os.path.exists(binary_path):
+            self._binary_path_cache[backend] = binary_path
             return binary_path
             
         logger.warning(f"Binary not found at {binary_path}, falling back to system path")
         return backend
 
+    def _probe_version_output(self, binary_path: str, cwd: Optional[str] = None) -> Optional[str]:
+        """
+        Run `<binary> version` and return its output, cached per (path, mtime).
+        Returns None if the command exits non-zero; raises if it cannot be run.
+        """
+        resolved = binary_path if os.path.isabs(binary_path) else shutil.which(binary_path)
+        key = None
+        if resolved:
+            try:
+                key = (resolved, os.stat(resolved).st_mtime)
+            except OSError:
+                key = None
+        if key is not None and key in self._version_probe_cache:
+            return self._version_probe_cache[key]
+
+        result = subprocess.run([binary_path, "version"], capture_output=True, text=True, timeout=2, cwd=cwd)
+        if result.returncode != 0:
+            return None
+
+        output = result.stdout.strip()
+        if key is not None:
+            self._version_probe_cache[key] = output
+        return output
+
     def get_installed_version_info(self, backend: str = "usque") -> Dict:
         """
         Get version info for the currently active backend.
         """
+        cached = self._info_cache.get(backend)
+        if cached is not None and time.monotonic() - cached[1] < self._VERSIONS_CACHE_TTL:
+            return dict(cached[0])
+
         binary_path = self.get_binary_path(backend)
         version_info = {
             "version": "Unknown",
@@ -136,18 +254,16 @@ class KernelVersionManager:
         
         # 1. Get local installed version
         try:
-            cmd = [binary_path, "version"]
             # On windows, sometimes full path is needed or current dir behavior differs
             cwd = os.path.dirname(binary_path) if os.path.isabs(binary_path) else None
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=2, cwd=cwd)
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                match = re.search(r'version\s+v?(\d+\.\d+\.\d+)', output, re.IGNORECASE)
+            output = self._probe_version_output(binary_path, cwd=cwd)
+            if output is not None:
+                match = _VER_LABELED.search(output)
                 if match:
                     version_info["version"] = match.group(1)
                 else:
-                    match = re.search(r'v?(\d+\.\d+\.\d+)', output)
+                    match = _VER_BARE.search(output)
                     if match:
                         version_info["version"] = match.group(1)
                     else:
@@ -164,7 +280,8 @@ class KernelVersionManager:
             version_info["latest_version"] = latest_cache
             if version_info["version"] != "Unknown" and latest_cache != version_info["version"]:
                  version_info["update_available"] = True
-                 
+
+        self._info_cache[backend] = (dict(version_info), time.monotonic())
         return version_info
 
     def check_for_updates(self, backend: str = "usque") -> Optional[str]:
@@ -174,24 +291,41 @@ class KernelVersionManager:
         if backend != "usque":
             return None
             
-        repo = "Diniboy1123/usque"
-        url = f"https://api.github.com/repos/{repo}/releases/latest"
-        
         try:
-            resp = requests.get(url, timeout=10)
+            resp = _gh.get(_USQUE_LATEST_URL, timeout=10)
             if resp.status_code == 200:
-                data = resp.json()
-                tag_name = data.get("tag_name", "").lstrip("v")
-                if tag_name:
-                    # Update cache via manager
-                    self.config_mgr.set(f"{backend}_latest_version", tag_name)
-                    logger.info(f"Latest {backend} version: {tag_name}")
-                    return tag_name
+                return self._record_latest_release(backend, resp.json())
         except Exception as e:
             logger.error(f"Failed to check updates for {backend}: {e}")
             
         return None
 
+    async def check_for_updates_async(self, backend: str = "usque") -> Optional[str]:
+        """
+        check_for_updates() on the event loop (httpx) instead of a worker thread.
+        """
+        if backend != "usque":
+            return None
+
+        try:
+            resp = await _get_gh_async().get(_USQUE_LATEST_URL)
+            if resp.status_code == 200:
+                return self._record_latest_release(backend, resp.json())
+        except Exception as e:
+            logger.error(f"Failed to check updates for {backend}: {e}")
+
+        return None
+
+    def _record_latest_release(self, backend: str, data: Dict) -> Optional[str]:
+        tag_name = data.get("tag_name", "").lstrip("v")
+        if tag_name:
+            # Update cache via manager
+            self.config_mgr.set(f"{backend}_latest_version", tag_name)
+            self._info_cache.pop(backend, None)
+            logger.info(f"Latest {backend} version: {tag_name}")
+            return tag_name
+        return None
+
     def auto_update(self, backend: str = "usque") -> bool:
         """
         Check for updates and install if newer version available.
@@ -252,17 +386,15 @@ class KernelVersionManager:
         api_url = f"https://api.github.com/repos/{repo}/releases/tags/v{version}"
         
         download_url = None
-        asset_name = None
         
         try:
-            resp = requests.get(api_url, timeout=10)
+            resp = _gh.get(api_url, timeout=10)
             if resp.status_code == 200:
                 data = resp.json()
                 for asset in data.get("assets", []):
                     name = asset.get("name", "").lower()
                     if os_name in name and arch_name in name:
                          download_url = asset.get("browser_download_url")
-                         asset_name = asset.get("name")
                          break
         except Exception as e:
             logger.error(f"Failed to get release info: {e}")
@@ -274,38 +406,38 @@ class KernelVersionManager:
             
         target_dir = os.path.join(self.kernels_dir, backend, version)
         
-        if os.path.exists(target_dir):
-            binary_name = backend + (".exe" if os_name == "windows" else "")
-            if os.path.exists(os.path.join(target_dir, binary_name)):
-                logger.info(f"Version {version} already installed")
-                return True
+        binary_name = backend + (".exe" if os_name == "windows" else "")
+        if os.path.exists(os.path.join(target_dir, binary_name)):
+            logger.info(f"Version {version} already installed")
+            return True
         
         os.makedirs(target_dir, exist_ok=True)
-        zip_path = os.path.join(target_dir, asset_name)
+        self._invalidate_caches(backend)
         
         logger.info(f"Downloading {download_url}...")
         try:
-            with requests.get(download_url, stream=True) as r:
-                r.raise_for_status()
-                with open(zip_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                        
-            logger.info("Extracting...")
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(target_dir)
-                
-            os.remove(zip_path)
+            # Spool the archive in memory (spills to disk only if unexpectedly large)
+            with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as buf:
+                with _gh.get(download_url, stream=True, headers={"Accept": "application/octet-stream"}) as r:
+                    r.raise_for_status()
+                    for chunk in r.iter_content(chunk_size=1 << 20):
+                        buf.write(chunk)
+                buf.seek(0)
+
+                logger.info("Extracting...")
+                with zipfile.ZipFile(buf, 'r') as zip_ref:
+                    zip_ref.extractall(target_dir)
             
             if os_name != "windows":
                 binary_path = os.path.join(target_dir, backend)
-                if os.path.exists(binary_path):
+                try:
                     st = os.stat(binary_path)
-                    os.chmod(binary_path, st.st_mode | stat.S_IEXEC)
-                else:
+                except FileNotFoundError:
                     logger.error("Binary not found after extraction")
                     return False
+                os.chmod(binary_path, st.st_mode | stat.S_IEXEC)
                     
+            self._invalidate_caches(backend)
             logger.info(f"Successfully installed {backend} {version}")
             return True
             
@@ -334,11 +466,9 @@ class KernelVersionManager:
         logger.info(f"Found system installation of {backend} at {system_path}")
         
         try:
-            cmd = [system_path, "version"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=2)
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                match = re.search(r'v?(\d+\.\d+\.\d+)', output)
+            output = self._probe_version_output(system_path)
+            if output is not None:
+                match = _VER_BARE.search(output)
                 if match:
                     version = match.group(1)
                     logger.info(f"Detected system version: {version}")
@@ -6,18 +6,48 @@ Supports proxy mode with MASQUE / WireGuard protocols
 import asyncio
 import logging
 import os
-from typing import Dict
-from .base_controller import WarpBackendController
+import re
+import shlex
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from .base_controller import WarpBackendController, read_small_file
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_REG_PATH = "/var/lib/cloudflare-warp/reg.json"
+# Fixed argv for the warp-cli calls made from Python (no shlex.split per call)
+_WARP_CLI = ["warp-cli", "--accept-tos"]
+_WARP_STATUS = _WARP_CLI + ["status"]
+_DISCONNECT_CMD = "warp-cli --accept-tos disconnect"
+_PROXY_SETTINGS = [
+    "warp-cli --accept-tos mode proxy",
+    "warp-cli --accept-tos proxy port 40001",
+    "warp-cli --accept-tos tunnel protocol set MASQUE",
+]
+
+_SOCAT_CMD_RE = re.compile(
+    r"command=/usr/bin/socat TCP-LISTEN:\d+,reuseaddr,bind=0\.0\.0\.0,fork TCP:127\.0\.0\.1:40001"
+)
+
 class OfficialController(WarpBackendController):
+    # conf_path -> (mtime_ns, size, port) last applied; shared because the files are global state
+    _conf_state: Dict[str, Tuple[int, int, int]] = {}
+    _DAEMON_ALIVE_TTL: float = 0.5
+    _SOCAT_OK_TTL: float = 2.0
 
     def __init__(self, socks5_port: int = 1080):
         super().__init__(socks5_port=socks5_port)
         self.mute_backend_logs = False
         self.preferred_protocol = "masque" 
+        self._daemon_alive_cache: Optional[Tuple[float, bool]] = None
+        # (time, stdout) of the last successful `warp-cli status` run by _probe_daemon
+        self._cli_status: Optional[Tuple[float, bytes]] = None
+        self._socat_lock = asyncio.Lock()
+        self._socat_ok: Optional[Tuple[int, float]] = None  # (port, time) socat last verified
+        self._reg_present = False  # Registration never disappears once seen, so stop stat()ing it
+        # mode/proxy port/protocol already pushed to the running warp-svc
+        self._proxy_settings_applied = False
 
     @property
     def mode(self) -> str:
@@ -27,11 +57,13 @@ class OfficialController(WarpBackendController):
     # Low-level helpers
     # ------------------------------------------------------------------
 
-    async def execute_command(self, command: str):
-        """Execute warp-cli command"""
+    async def execute_command(self, command: Union[str, List[str]]):
+        """Execute warp-cli command (argv list or command string)"""
         try:
             rc, stdout, stderr = await self._run_command(command, timeout=10)
             if rc != 0:
+                if not isinstance(command, str):
+                    command = " ".join(command)
                 logger.error(f"Command '{command}' failed: {stderr.strip()}")
                 return None
             return stdout.strip()
@@ -39,18 +71,65 @@ class OfficialController(WarpBackendController):
             logger.error(f"Error executing '{command}': {e}")
             return None
 
+    async def _run_script(self, lines: List[str], timeout=10, stop_on_error: bool = True, decode: bool = True,
+                          non_fatal: Tuple[str, ...] = ()):
+        """
+        Run several commands in a single /bin/sh invocation (one fork/exec instead of one per command).
+        With stop_on_error the script stops at the first failing command (except those listed in
+        non_fatal), otherwise each runs regardless and the return code is that of the last command.
+        Either way a failing command reports itself on stderr, so the log names the step that broke.
+        With decode=False output stays bytes (stderr is decoded only to log a failure).
+        """
+        def on_fail(line: str) -> str:
+            return "exit $rc" if stop_on_error and line not in non_fatal else "(exit $rc)"
+
+        script = "\n".join(
+            f"{line} || {{ rc=$?; echo {shlex.quote(f'{line!r} failed')} \"(rc=$rc)\" >&2; {on_fail(line)}; }}"
+            for line in lines
+        )
+        rc, stdout, stderr = await self._run_command(["/bin/sh", "-c", script], timeout=timeout, decode=decode)
+        err = stderr if decode else stderr.decode("utf-8", "replace").strip()
+        if rc != 0 or " failed (rc=" in err:
+            logger.error(f"Script {lines} failed: {err}")
+        return rc, stdout, stderr
+
+    def _invalidate_status_cache(self):
+        super()._invalidate_status_cache()
+        self._daemon_alive_cache = None
+        self._cli_status = None
+
+    def _registration_present(self) -> bool:
+        if not self._reg_present:
+            self._reg_present = os.path.exists(_REG_PATH)
+        return self._reg_present
+
     async def _is_daemon_responsive(self) -> bool:
-        """Check if warp-svc is running AND responsive"""
-        try:
-            rc, stdout, _ = await self._run_command("supervisorctl status warp-svc")
-            if rc != 0 or "RUNNING" not in stdout:
-                return False
-            
+        """Check if warp-svc is running AND responsive (cached briefly)"""
+        cached = self._daemon_alive_cache
+        if cached is not None and time.monotonic() - cached[0] < self._DAEMON_ALIVE_TTL:
+            return cached[1]
+
+        alive = await self._probe_daemon()
+        self._daemon_alive_cache = (time.monotonic(), alive)
+        return alive
+
+    async def _probe_daemon(self) -> bool:
+        # Both checks usually pass, so run them concurrently rather than back to back
+        svc, cli = await asyncio.gather(
+            self._supervisorctl("status", "warp-svc"),
             # Use a short timeout for responsiveness check
-            rc, _, _ = await self._run_command("warp-cli --accept-tos status", timeout=2)
-            return rc == 0
-        except Exception:
+            self._run_command(_WARP_STATUS, timeout=2, decode=False),
+            return_exceptions=True,
+        )
+        if isinstance(svc, BaseException) or isinstance(cli, BaseException):
+            return False
+        rc, stdout = svc
+        if rc != 0 or "RUNNING" not in stdout:
             return False
+        if cli[0] != 0:
+            return False
+        self._cli_status = (time.monotonic(), cli[1])
+        return True
 
     async def _check_daemon_running(self) -> bool:
         return await self._is_daemon_responsive()
@@ -66,9 +145,9 @@ class OfficialController(WarpBackendController):
     async def _connect_proxy(self) -> bool:
         """Connect in proxy mode"""
         # Ensure registration exists first
-        if not os.path.exists("/var/lib/cloudflare-warp/reg.json"):
+        if not self._registration_present():
             logger.info("No registration found, attempting to register...")
-            await self.execute_command("warp-cli --accept-tos registration new")
+            await self.execute_command(_WARP_CLI + ["registration", "new"])
             
         if not await self._is_daemon_responsive():
             logger.info("Daemon not ready, restarting services...")
@@ -81,20 +160,23 @@ class OfficialController(WarpBackendController):
 
         logger.info("Connecting WARP (official, proxy mode)...")
         
-        # Reset mode first to ensure clean state
-        await self.execute_command("warp-cli --accept-tos disconnect")
-        
-        # Configure
-        await self.execute_command("warp-cli --accept-tos mode proxy")
-        await self.execute_command("warp-cli --accept-tos proxy port 40001")
-        await self.execute_command("warp-cli --accept-tos tunnel protocol set MASQUE")
-        
-        # Connect
-        res = await self.execute_command("warp-cli --accept-tos connect")
-        if res and "Error" in res:
-             logger.error(f"Connect command returned error: {res}")
-
-        await asyncio.sleep(2)
+        # Reset mode first to ensure clean state, then configure unless this warp-svc
+        # already has our settings. A failed disconnect is only reported; the settings
+        # stop at the first failure, so rc (and the applied flag) reflects them alone
+        script = [_DISCONNECT_CMD]
+        if not self._proxy_settings_applied:
+            script += _PROXY_SETTINGS
+        rc, _, _ = await self._run_script(script, decode=False, non_fatal=(_DISCONNECT_CMD,))
+        if len(script) > 1:
+            self._proxy_settings_applied = rc == 0
+
+        # connect is checked on its own result, not mixed with the steps above
+        res = await self.execute_command(_WARP_CLI + ["connect"])
+        self._signal_state_change()
+        if res is None or "Error" in res:
+             self._proxy_settings_applied = False
+             if res:
+                 logger.error(f"Connect command returned error: {res}")
 
         if await self.wait_for_status("connected", timeout=30): 
             self.mute_backend_logs = True
@@ -103,7 +185,7 @@ class OfficialController(WarpBackendController):
             return True
 
         # Diagnostic log
-        status = await self.execute_command("warp-cli --accept-tos status")
+        status = await self.execute_command(_WARP_STATUS)
         logger.error(f"Official WARP proxy connection failed. Status: {status}")
         return False
 
@@ -114,12 +196,19 @@ class OfficialController(WarpBackendController):
         self._invalidate_status_cache()
 
         try:
-            await self.execute_command("warp-cli --accept-tos disconnect")
-            await self.wait_for_status("disconnected", timeout=5)
+            # Nothing to disconnect if warp-svc isn't up; warp-cli would only fail
+            # trying to reach the daemon
+            rc, status = await self._supervisorctl("status", "warp-svc")
+            if rc == 0 and "RUNNING" in status:
+                await self.execute_command(_WARP_CLI + ["disconnect"])
+                self._signal_state_change()
+                await self.wait_for_status("disconnected", timeout=5)
         except Exception:
             pass
 
         await self._stop_services()
+        self._signal_state_change()
+        await self._close_http_client()
         logger.info("WARP disconnected successfully")
         return True
 
@@ -134,7 +223,7 @@ class OfficialController(WarpBackendController):
             self.mute_backend_logs = False
 
             try:
-                rc, _, _ = await self._run_command("supervisorctl start warp-svc")
+                rc, _ = await self._supervisorctl("start", "warp-svc")
                 if rc != 0:
                      logger.error("Failed to start warp-svc")
                      return False
@@ -142,14 +231,13 @@ class OfficialController(WarpBackendController):
                 logger.error("Failed to start warp-svc")
                 return False
 
-            await asyncio.sleep(3)
             await self._ensure_socat()
 
-            for _ in range(30):
-                if await self._is_daemon_responsive():
-                    logger.info("warp-svc is ready")
-                    return await self._configure_warp_proxy()
-                await asyncio.sleep(1)
+            # Probe uncached while waiting; the 500 ms cache would hide readiness
+            if await self._wait_until(self._probe_daemon, timeout=33):
+                self._daemon_alive_cache = None
+                logger.info("warp-svc is ready")
+                return await self._configure_warp_proxy()
 
             logger.error("Timed out waiting for warp-svc")
             return False
@@ -160,14 +248,13 @@ class OfficialController(WarpBackendController):
     async def _configure_warp_proxy(self) -> bool:
         """Apply WARP configuration for proxy mode"""
         try:
-            if not os.path.exists("/var/lib/cloudflare-warp/reg.json"):
+            if not self._registration_present():
                 logger.info("Registering new WARP account...")
-                await self.execute_command("warp-cli --accept-tos registration delete")
-                await self.execute_command("warp-cli --accept-tos registration new")
+                await self.execute_command(_WARP_CLI + ["registration", "delete"])
+                await self.execute_command(_WARP_CLI + ["registration", "new"])
 
-            await self.execute_command("warp-cli --accept-tos tunnel protocol set MASQUE")
-            await self.execute_command("warp-cli --accept-tos mode proxy")
-            await self.execute_command("warp-cli --accept-tos proxy port 40001")
+            rc, _, _ = await self._run_script(_PROXY_SETTINGS, decode=False)
+            self._proxy_settings_applied = rc == 0
             return True
         except Exception as e:
             logger.error(f"Error configuring WARP proxy: {e}")
@@ -177,9 +264,16 @@ class OfficialController(WarpBackendController):
     async def _stop_services(self):
         """Stop all possible services (safe for both modes)"""
         logger.info("Stopping official services...")
+        self._daemon_alive_cache = None
+        self._cli_status = None
+        self._socat_ok = None
+        self._proxy_settings_applied = False
         try:
-            await self._run_command("supervisorctl stop socat")
-            await self._run_command("supervisorctl stop warp-svc")
+            # Independent programs: stop them concurrently
+            await asyncio.gather(
+                self._supervisorctl("stop", "socat"),
+                self._supervisorctl("stop", "warp-svc"),
+            )
         except Exception as e:
             logger.error(f"Error stopping services: {e}")
 
@@ -192,12 +286,26 @@ class OfficialController(WarpBackendController):
         if self.mode != "proxy":
             return
 
+        # Serialize concurrent callers so they don't race stop/start on the same port
+        async with self._socat_lock:
+            ok = self._socat_ok
+            if (
+                ok is not None
+                and ok[0] == self.socks5_port
+                and time.monotonic() - ok[1] < self._SOCAT_OK_TTL
+                and await self._is_port_open(self.socks5_port)
+            ):
+                return
+
+            await self._ensure_socat_locked()
+
+    async def _ensure_socat_locked(self):
         # Update supervisor config if port differs from default
         await self._update_supervisor_socat_port()
 
         sys_active = False
         try:
-            rc, stdout, _ = await self._run_command("supervisorctl status socat")
+            rc, stdout = await self._supervisorctl("status", "socat")
             sys_active = rc == 0 and "RUNNING" in stdout
         except Exception:
             pass
@@ -205,47 +313,52 @@ class OfficialController(WarpBackendController):
         port_open = await self._is_port_open(self.socks5_port)
 
         if sys_active and port_open:
+            self._socat_ok = (self.socks5_port, time.monotonic())
             return
 
         logger.info(f"Starting socat service (port {self.socks5_port})...")
         try:
             # Stop first to pick up config changes
-            await self._run_command("supervisorctl stop socat")
-            await asyncio.sleep(0.3)
-            await self._run_command("supervisorctl start socat")
-            await asyncio.sleep(1)
-            if not await self._is_port_open(self.socks5_port):
+            await self._supervisorctl("stop", "socat")
+            await self._wait_port_closed(self.socks5_port, 1.0)
+            await self._supervisorctl("start", "socat")
+            if await self._wait_port_open(self.socks5_port, 3.0):
+                self._socat_ok = (self.socks5_port, time.monotonic())
+            else:
                 logger.warning(f"Socat started but port {self.socks5_port} not listening yet")
-                await asyncio.sleep(2)
         except Exception as e:
             logger.error(f"Error starting socat: {e}")
 
     async def _update_supervisor_socat_port(self):
         """Update the socat supervisor config to use the current socks5_port."""
-        import re as _re
         conf_paths = [
             "/etc/supervisor/conf.d/supervisord.conf",
             "/etc/supervisor/conf.d/warppool.conf",
         ]
         for conf_path in conf_paths:
-            if not os.path.isfile(conf_path):
+            try:
+                st = os.stat(conf_path)
+            except OSError:
                 continue
+            # Skip the read/rewrite entirely if we already applied this port and nobody touched the file
+            if self._conf_state.get(conf_path) == (st.st_mtime_ns, st.st_size, self.socks5_port):
+                break
             try:
-                with open(conf_path, "r") as f:
-                    content = f.read()
+                content = read_small_file(conf_path, st.st_size + 1)
 
                 new_cmd = f"command=/usr/bin/socat TCP-LISTEN:{self.socks5_port},reuseaddr,bind=0.0.0.0,fork TCP:127.0.0.1:40001"
-                updated = _re.sub(
-                    r"command=/usr/bin/socat TCP-LISTEN:\d+,reuseaddr,bind=0\.0\.0\.0,fork TCP:127\.0\.0\.1:40001",
-                    new_cmd,
-                    content,
-                )
+                updated, matches = _SOCAT_CMD_RE.subn(new_cmd, content)
+                if not matches:
+                    # This file doesn't define the socat program; try the next one
+                    continue
                 if updated != content:
                     with open(conf_path, "w") as f:
                         f.write(updated)
-                    await self._run_command("supervisorctl reread")
-                    await self._run_command("supervisorctl update")
+                    await self._supervisorctl("update")
                     logger.info(f"Updated socat supervisor config to port {self.socks5_port}")
+                st = os.stat(conf_path)
+                self._conf_state[conf_path] = (st.st_mtime_ns, st.st_size, self.socks5_port)
+                break
             except Exception as e:
                 logger.warning(f"Failed to update socat config in {conf_path}: {e}")
 
@@ -259,11 +372,17 @@ class OfficialController(WarpBackendController):
         if not await self._check_daemon_running():
             return False
         try:
-            rc, stdout, _ = await self._run_command("warp-cli --accept-tos status", timeout=3)
-            if rc != 0:
-                return False
-            output = stdout.lower()
-            return "connected" in output and "disconnected" not in output
+            # The daemon probe just ran `warp-cli status`; reuse its output if fresh
+            cli = self._cli_status
+            if cli is not None and time.monotonic() - cli[0] < self._DAEMON_ALIVE_TTL:
+                raw = cli[1]
+            else:
+                rc, raw, _ = await self._run_command(_WARP_STATUS, timeout=3, decode=False)
+                if rc != 0:
+                    return False
+            # Matched on the raw bytes; nothing else needs the decoded text
+            output = raw.lower()
+            return b"connected" in output and b"disconnected" not in output
         except Exception:
             return False
 
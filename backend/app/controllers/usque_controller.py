@@ -7,19 +7,27 @@ import asyncio
 import logging
 import json
 import os
-from typing import Optional, Dict
+import re
+from typing import Optional, Dict, Tuple
 from .kernel_controller import KernelVersionManager
-from .base_controller import WarpBackendController
+from .base_controller import WarpBackendController, read_small_file
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_USQUE_CMD_RE = re.compile(
+    r"command=/usr/local/bin/usque -c /var/lib/warp/config\.json socks -b 0\.0\.0\.0 -p \d+"
+)
+
 class UsqueController(WarpBackendController):
+    # conf_path -> (mtime_ns, size, port) last applied; shared because the files are global state
+    _conf_state: Dict[str, Tuple[int, int, int]] = {}
 
     def __init__(self, config_path=None, socks5_port=1080):
         super().__init__(socks5_port=socks5_port)
         self.config_path = config_path or os.getenv("USQUE_CONFIG_PATH", "/var/lib/warp/config.json")
         self.process = None
+        self._registered = False  # Account config seen once; skip makedirs/stat on later connects
 
     @property
     def mode(self) -> str:
@@ -31,6 +39,8 @@ class UsqueController(WarpBackendController):
 
     async def initialize(self) -> bool:
         """Initialize usque backend (register if needed)"""
+        if self._registered:
+            return True
         try:
             config_dir = os.path.dirname(self.config_path)
             os.makedirs(config_dir, exist_ok=True)
@@ -50,10 +60,12 @@ class UsqueController(WarpBackendController):
 
                 if process.returncode == 0:
                     logger.info("usque registration successful")
+                    self._registered = True
                     return True
                 else:
                     logger.error(f"usque registration failed: {stderr.decode()}")
                     return False
+            self._registered = True
             return True
         except Exception as e:
             logger.error(f"Error initializing usque: {e}")
@@ -82,20 +94,18 @@ class UsqueController(WarpBackendController):
             # Update supervisor config if port changed
             await self._update_supervisor_usque_port()
 
-            # Ensure clean state (clear FATAL/BACKOFF from previous runs)
-            await self._run_command("supervisorctl stop usque")
-            await asyncio.sleep(0.5)
-            rc, _, _ = await self._run_command("supervisorctl start usque")
+            # Ensure clean state (clear FATAL/BACKOFF from previous runs); stop and
+            # start go to supervisord in a single round trip
+            rc, _ = await self._supervisorctl("restart", "usque")
+            self._signal_state_change()
             if rc != 0:
                 logger.error("Failed to start usque via supervisor")
                 return False
 
             logger.info("Waiting for usque proxy to become ready...")
-            for _ in range(15):
-                if await self._is_proxy_connected():
-                    logger.info("usque proxy started successfully")
-                    return True
-                await asyncio.sleep(1)
+            if await self._wait_until(self._is_proxy_connected, timeout=15):
+                logger.info("usque proxy started successfully")
+                return True
 
             logger.error("usque proxy failed to start (timeout)")
             return False
@@ -105,33 +115,35 @@ class UsqueController(WarpBackendController):
 
     async def _update_supervisor_usque_port(self):
         """Update the usque supervisor config to use the current socks5_port."""
-        import re as _re
         conf_paths = [
             "/etc/supervisor/conf.d/supervisord.conf",
             "/etc/supervisor/conf.d/warppool.conf",
         ]
         for conf_path in conf_paths:
-            if not os.path.isfile(conf_path):
+            try:
+                st = os.stat(conf_path)
+            except OSError:
                 continue
+            # Skip the read/rewrite entirely if we already applied this port and nobody touched the file
+            if self._conf_state.get(conf_path) == (st.st_mtime_ns, st.st_size, self.socks5_port):
+                break
             try:
-                with open(conf_path, "r") as f:
-                    content = f.read()
+                content = read_small_file(conf_path, st.st_size + 1)
 
                 # Match: command=.../usque -c ... socks -b 0.0.0.0 -p <PORT>
-                # Using regex to find existing port and replace
-                # Assuming command structure
                 new_cmd = f"command=/usr/local/bin/usque -c /var/lib/warp/config.json socks -b 0.0.0.0 -p {self.socks5_port}"
-                updated = _re.sub(
-                    r"command=/usr/local/bin/usque -c /var/lib/warp/config\.json socks -b 0\.0\.0\.0 -p \d+",
-                    new_cmd,
-                    content,
-                )
+                updated, matches = _USQUE_CMD_RE.subn(new_cmd, content)
+                if not matches:
+                    # This file doesn't define the usque program; try the next one
+                    continue
                 if updated != content:
                     with open(conf_path, "w") as f:
                         f.write(updated)
-                    await self._run_command("supervisorctl reread")
-                    await self._run_command("supervisorctl update")
+                    await self._supervisorctl("update")
                     logger.info(f"Updated usque supervisor config to port {self.socks5_port}")
+                st = os.stat(conf_path)
+                self._conf_state[conf_path] = (st.st_mtime_ns, st.st_size, self.socks5_port)
+                break
             except Exception as e:
                 logger.warning(f"Failed to update usque config in {conf_path}: {e}")
 
@@ -140,10 +152,14 @@ class UsqueController(WarpBackendController):
         try:
             logger.info("Stopping usque services...")
             
-            await self._run_command("supervisorctl stop usque")
+            await self._supervisorctl("stop", "usque")
             
             self.process = None
             self._invalidate_status_cache()
+            self._signal_state_change()
+            # Pooled proxy connections are dead once usque stops; also keeps a
+            # discarded controller (backend switch/reset) from leaking the pool
+            await self._close_http_client()
             return True
         except Exception as e:
             logger.error(f"Error stopping usque: {e}")
@@ -156,7 +172,7 @@ class UsqueController(WarpBackendController):
     async def _is_proxy_connected(self) -> bool:
         """Check if usque SOCKS5 proxy is running"""
         try:
-            rc, stdout, _ = await self._run_command("supervisorctl status usque")
+            rc, stdout = await self._supervisorctl("status", "usque")
             if rc != 0 or "RUNNING" not in stdout:
                 return False
         except Exception:
@@ -6,13 +6,23 @@ Automatically selects between usque and official backends based on environment
 import os
 import logging
 import asyncio
+import re
+import signal
+import time
 from typing import Union
 from .usque_controller import UsqueController
 from .official_controller import OfficialController
+from .base_controller import communicate_with_timeout, is_port_open
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# `ss -p` prints owners as users:(("name",pid=123,fd=4))
+_SS_PID_RE = re.compile(r"pid=(\d+)")
+
+# Backend selected via the environment; read once and updated by switch_backend
+_env_backend = os.getenv("WARP_BACKEND", "usque").lower()
+
 class WarpController:
     """Factory class for WARP backend controllers"""
     
@@ -29,7 +39,7 @@ class WarpController:
         if socks5_port is not None:
             cls._socks5_port = socks5_port
 
-        backend = os.getenv("WARP_BACKEND", "usque").lower()
+        backend = _env_backend
         
         # Create new instance if needed
         if cls._instance is None or cls._current_backend != backend:
@@ -53,8 +63,9 @@ class WarpController:
         """
         if new_backend not in ["usque", "official"]:
             raise ValueError(f"Invalid backend: {new_backend}. Use 'usque' or 'official'")
-        
-        current_backend = cls._current_backend or os.getenv("WARP_BACKEND", "usque")
+
+        global _env_backend
+        current_backend = cls._current_backend or _env_backend
         if current_backend == new_backend and cls._instance:
             logger.info(f"Already using {new_backend} backend")
             return cls._instance
@@ -76,19 +87,64 @@ class WarpController:
         # Ensure SOCKS5 port is released before switching
         port = cls._socks5_port
         logger.info(f"Waiting for port {port} to be released...")
-        for _ in range(10): # Wait up to 5 seconds
-            try:
-                # Use asyncio to check port
-                reader, writer = await asyncio.open_connection('127.0.0.1', port)
-                writer.close()
-                await writer.wait_closed()
-                # Connected means port is busy
-                await asyncio.sleep(0.5)
-            except (ConnectionRefusedError, OSError):
-                # Connection refused means port is free
+        # Wait up to 5 seconds, re-checking quickly at first: the listener
+        # usually goes away right after disconnect()
+        deadline = time.monotonic() + 5.0
+        delay = 0.05
+        while True:
+            port_free = not await is_port_open(port)
+            if port_free or time.monotonic() >= deadline:
                 break
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, 0.5)
         
         # Force kill if still occupied (last resort)
+        if not port_free:
+            await cls._kill_port_listeners(port)
+        
+        # Update environment and reset instance
+        os.environ["WARP_BACKEND"] = new_backend
+        _env_backend = new_backend
+        cls._instance = None
+        cls._current_backend = None
+        
+        logger.info(f"Backend switched to {new_backend}, creating new controller...")
+        
+        # Return new instance
+        return cls.get_instance()
+    
+    @classmethod
+    async def _kill_port_listeners(cls, port: int):
+        """Kill whatever still listens on the port, asking `ss` for just that socket."""
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "ss", "-Hnltp", f"sport = :{port}",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await communicate_with_timeout(process, 3)
+        except Exception:
+            # A hung ss is killed and reaped rather than left behind as a zombie
+            if process is not None and process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            # ss unavailable: fall back to a full psutil scan
+            cls._kill_port_listeners_psutil(port)
+            return
+
+        for pid in {int(p) for p in _SS_PID_RE.findall(stdout.decode(errors="replace"))}:
+            logger.warning(f"Port {port} still in use by PID {pid}, killing...")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _kill_port_listeners_psutil(port: int):
         try:
             import psutil
             for conn in psutil.net_connections():
@@ -102,21 +158,11 @@ class WarpController:
             pass
         except Exception:
             pass
-        
-        # Update environment and reset instance
-        os.environ["WARP_BACKEND"] = new_backend
-        cls._instance = None
-        cls._current_backend = None
-        
-        logger.info(f"Backend switched to {new_backend}, creating new controller...")
-        
-        # Return new instance
-        return cls.get_instance()
-    
+
     @classmethod
     def get_current_backend(cls) -> str:
         """Get the name of the current backend"""
-        return cls._current_backend or os.getenv("WARP_BACKEND", "usque")
+        return cls._current_backend or _env_backend
 
     @classmethod
     def get_current_mode(cls) -> str:
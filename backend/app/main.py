@@ -1,12 +1,15 @@
 import asyncio
 import logging
+import mimetypes
 import os
-from concurrent.futures import ThreadPoolExecutor
+import stat
+from typing import Dict, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 
 # New Imports
 from .utils.logger import setup_logging, log_collector
@@ -16,7 +19,7 @@ from .controllers.config_controller import ConfigManager
 
 
 # Correct imports based on file moves
-from .controllers.kernel_controller import KernelVersionManager
+from .controllers.kernel_controller import KernelVersionManager, close_gh_async, run_kernel_io
 from .controllers.auth_controller import AuthHandler
 
 # Routes
@@ -34,10 +37,7 @@ auth_handler = AuthHandler.get_instance()
 SOCKS5_PORT = config_mgr.socks5_port
 PANEL_PORT = config_mgr.panel_port
 
-# Limit thread pool
-_thread_pool = ThreadPoolExecutor(max_workers=4)
-
-app = FastAPI(title="WARP Single Client")
+app = FastAPI(title="WARP Single Client", default_response_class=ORJSONResponse)
 
 # Inject manager into log_collector
 log_collector.manager = manager
@@ -57,25 +57,30 @@ async def startup_event():
     asyncio.create_task(connect_in_background(controller))
     asyncio.create_task(status_broadcast_loop())
     asyncio.create_task(auto_update_task())
+    asyncio.create_task(ws_keepalive_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """App shutdown cleanup."""
+    try:
+        await close_gh_async()
+    except Exception as e:
+        logger.warning(f"Failed to close update-check client: {e}")
 
 # Tasks (kept here or moved to utils/tasks.py - keeping here for simplicity as they tie everything together)
 async def connect_in_background(controller):
     logger.info("Starting WARP backend (background)...")
     await controller.connect()
 
-async def run_blocking(func, *args):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(_thread_pool, func, *args)
-
 async def auto_update_task():
     try:
-        await run_blocking(KernelVersionManager.get_instance().adopt_system_installation, "usque")
+        await run_kernel_io(KernelVersionManager.get_instance().adopt_system_installation, "usque")
     except Exception as e:
         logger.warning(f"Failed to adopt system installation: {e}")
 
     logger.info("Running kernel auto-update check...")
     try:
-        await run_blocking(KernelVersionManager.get_instance().auto_update, "usque")
+        await run_kernel_io(KernelVersionManager.get_instance().auto_update, "usque")
     except Exception as e:
         logger.error(f"Auto-update failed: {e}")
 
@@ -91,6 +96,25 @@ async def status_broadcast_loop(interval: float = 10.0):
         except Exception:
             await asyncio.sleep(interval)
 
+async def ws_keepalive_loop(interval: float = 30.0):
+    # One timer for every socket instead of a receive timeout per connection
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if manager.active_connections:
+                await manager.broadcast_ping()
+        except Exception:
+            pass
+
+# Request-model validation errors keep the old 400 + string detail the frontend alerts
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    messages = []
+    for err in exc.errors():
+        field = ".".join(str(part) for part in err.get("loc", ()) if part != "body")
+        messages.append(f"{field}: {err.get('msg')}" if field else str(err.get("msg")))
+    return ORJSONResponse(status_code=400, content={"detail": "; ".join(messages) or "Invalid request"})
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -132,10 +156,8 @@ async def websocket_endpoint(websocket: WebSocket):
 
         while True:
             try:
-                await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
-            except asyncio.TimeoutError:
-                # Send a ping or keep-alive if needed, or just continue waiting
-                continue
+                # Keep-alive pings come from ws_keepalive_loop
+                await websocket.receive_text()
             except WebSocketDisconnect:
                 break
             
@@ -156,21 +178,64 @@ if not os.path.exists(STATIC_DIR):
     if os.path.exists(local_static):
         STATIC_DIR = local_static
 
+# Small SPA files (index.html, favicon, ...) kept in memory, revalidated by mtime/size
+# path -> (mtime_ns, size, body, etag, media_type)
+_STATIC_CACHE: Dict[str, Tuple[int, int, bytes, str, str]] = {}
+_STATIC_CACHE_MAX_FILE = 1024 * 1024  # Larger files are streamed with FileResponse
+_INDEX_PATH = os.path.join(STATIC_DIR, "index.html")
+_STATIC_ROOT = os.path.realpath(STATIC_DIR)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _static_response(path: str, request: Request, st: Optional[os.stat_result] = None):
+    if st is None:
+        st = os.stat(path)
+    if st.st_size > _STATIC_CACHE_MAX_FILE:
+        return FileResponse(path)
+
+    cached = _STATIC_CACHE.get(path)
+    if cached is None or cached[0] != st.st_mtime_ns or cached[1] != st.st_size:
+        # Cache miss: read off the event loop (files here can be up to 1 MiB)
+        body = await asyncio.to_thread(_read_file, path)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        cached = (st.st_mtime_ns, st.st_size, body, etag, media_type)
+        _STATIC_CACHE[path] = cached
+
+    _, _, body, etag, media_type = cached
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type=media_type, headers={"ETag": etag})
+
+
 if os.path.exists(STATIC_DIR):
     app.mount("/assets", StaticFiles(directory=f"{STATIC_DIR}/assets"), name="assets")
 
     @app.get("/")
-    async def read_index():
-        return FileResponse(f'{STATIC_DIR}/index.html')
+    async def read_index(request: Request):
+        return await _static_response(_INDEX_PATH, request)
 else:
     logger.warning(f"Static files directory {STATIC_DIR} not found. Frontend will not be served.")
 
 @app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
+async def serve_spa(full_path: str, request: Request):
     if full_path.startswith("api") or full_path.startswith("ws"):
          raise HTTPException(status_code=404)
     
-    if os.path.exists(f"{STATIC_DIR}/{full_path}"):
-        return FileResponse(f"{STATIC_DIR}/{full_path}")
-        
-    return FileResponse(f'{STATIC_DIR}/index.html')
+    # Client-side routes and anything resolving outside STATIC_DIR go to index.html
+    if full_path:
+        try:
+            path = os.path.realpath(os.path.join(_STATIC_ROOT, full_path.lstrip("/")))
+            inside = os.path.commonpath([path, _STATIC_ROOT]) == _STATIC_ROOT
+            st = os.stat(path) if inside else None
+        except (OSError, ValueError):
+            # ValueError: NUL byte in the path
+            st = None
+        if st is not None and stat.S_ISREG(st.st_mode):
+            return await _static_response(path, request, st)
+
+    return await _static_response(_INDEX_PATH, request)
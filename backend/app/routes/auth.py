@@ -4,6 +4,7 @@ from ..controllers.auth_controller import AuthHandler
 
 router = APIRouter()
 auth_handler = AuthHandler.get_instance()
+get_current_user = auth_handler.get_current_user
 
 class LoginRequest(BaseModel):
     password: str
@@ -16,5 +17,5 @@ async def login(req: LoginRequest):
     raise HTTPException(status_code=401, detail="Invalid password")
 
 @router.get("/check")
-async def check_auth(user: str = Depends(auth_handler.get_current_user)):
+async def check_auth(user: str = Depends(get_current_user)):
     return {"authenticated": True, "user": user}
@@ -1,28 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from typing import Optional
 from ..controllers.auth_controller import AuthHandler
 from ..controllers.config_controller import ConfigManager
 from ..controllers.warp_controller import WarpController
 from ..utils.logger import log_collector
 import logging
-import asyncio
 
-router = APIRouter()
 logger = logging.getLogger(__name__)
 auth_handler = AuthHandler.get_instance()
+get_current_user = auth_handler.get_current_user
+router = APIRouter(dependencies=[Depends(get_current_user)])
 config_mgr = ConfigManager.get_instance()
 
+class PasswordRequest(BaseModel):
+    password: str
+
+class PortsRequest(BaseModel):
+    socks5_port: Optional[int] = Field(None, ge=1, le=65535)
+    panel_port: Optional[int] = Field(None, ge=1, le=65535)
+
 @router.post("/password")
-async def set_password(request: dict, user: str = Depends(auth_handler.get_current_user)):
+async def set_password(request: PasswordRequest):
     """Update panel password"""
-    pwd = request.get("password")
-    if pwd is None:
-        raise HTTPException(status_code=400, detail="Password required")
-    
-    config_mgr.set("panel_password", pwd)
+    config_mgr.set("panel_password", request.password)
     return {"success": True}
 
 @router.get("/ports")
-async def get_ports(user: str = Depends(auth_handler.get_current_user)):
+async def get_ports():
     """Get current port configuration"""
     return {
         "socks5_port": config_mgr.socks5_port,
@@ -30,25 +35,12 @@ async def get_ports(user: str = Depends(auth_handler.get_current_user)):
     }
 
 @router.post("/ports")
-async def set_ports(request: dict, user: str = Depends(auth_handler.get_current_user)):
+async def set_ports(request: PortsRequest):
     """
     Update port configuration.
     """
-    new_socks5 = request.get("socks5_port")
-    new_panel = request.get("panel_port")
-
-    # Validate
-    try:
-        if new_socks5 is not None:
-            new_socks5 = int(new_socks5)
-            if not (1 <= new_socks5 <= 65535):
-                raise ValueError
-        if new_panel is not None:
-            new_panel = int(new_panel)
-            if not (1 <= new_panel <= 65535):
-                raise ValueError
-    except (ValueError, TypeError):
-        raise HTTPException(status_code=400, detail="Invalid port number (must be 1-65535)")
+    new_socks5 = request.socks5_port
+    new_panel = request.panel_port
 
     current_socks5 = config_mgr.socks5_port
     current_panel = config_mgr.panel_port
@@ -88,7 +80,7 @@ async def set_ports(request: dict, user: str = Depends(auth_handler.get_current_
         # or we might need to manually set it if reusing.
         # update_socks5_port already updates it on the instance if it exists.
         
-        await asyncio.sleep(1)
+        await controller.wait_for_status("disconnected", timeout=1)
         await controller.connect()
 
     if panel_changed:
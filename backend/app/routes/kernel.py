@@ -1,33 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
 from ..controllers.auth_controller import AuthHandler
-from ..controllers.kernel_controller import KernelVersionManager
+from ..controllers.kernel_controller import KernelVersionManager, run_kernel_io
 from ..controllers.warp_controller import WarpController
 import logging
 import asyncio
 
-router = APIRouter()
 logger = logging.getLogger(__name__)
 auth_handler = AuthHandler.get_instance()
+get_current_user = auth_handler.get_current_user
+router = APIRouter(dependencies=[Depends(get_current_user)])
 kernel_mgr = KernelVersionManager.get_instance()
 
-# Helper for running blocking functions
-async def run_blocking(func, *args):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, func, *args)
+class BackendRequest(BaseModel):
+    backend: str = "usque"
+
+class VersionRequest(BaseModel):
+    backend: str = Field(..., min_length=1)
+    version: str = Field(..., min_length=1)
+
+async def _fetch_backend_versions(backend: str):
+    """Run the three independent kernel lookups for a backend concurrently"""
+    return await asyncio.gather(
+        run_kernel_io(kernel_mgr.list_versions, backend),
+        run_kernel_io(kernel_mgr.get_active_version, backend),
+        run_kernel_io(kernel_mgr.get_installed_version_info, backend),
+    )
 
 @router.get("/versions")
-async def get_kernel_versions(backend: str = None, user: str = Depends(auth_handler.get_current_user)):
+async def get_kernel_versions(backend: str = None):
     """List available versions for the specified backend (or current backend)"""
     if not backend:
         backend = WarpController.get_current_backend()
         
-    versions = await run_blocking(kernel_mgr.list_versions, backend)
-    # Get current active version (configured)
-    current_active = await run_blocking(kernel_mgr.get_active_version, backend)
-    
-    # Get detailed info (installed version, latest version)
-    info = await run_blocking(kernel_mgr.get_installed_version_info, backend)
-    
+    # Available versions, current active version (configured) and detailed info
+    # (installed version, latest version), fetched concurrently
+    versions, current_active, info = await _fetch_backend_versions(backend)
+
     return {
         "backend": backend,
         "versions": versions,
@@ -38,70 +47,69 @@ async def get_kernel_versions(backend: str = None, user: str = Depends(auth_hand
     }
 
 @router.get("/all-versions")
-async def get_all_kernel_versions(user: str = Depends(auth_handler.get_current_user)):
+async def get_all_kernel_versions():
     """Get version info for all backends"""
     backends = ["usque", "official"]
     results = {}
-    
-    for backend in backends:
-        try:
-            versions = await run_blocking(kernel_mgr.list_versions, backend)
-            current_active = await run_blocking(kernel_mgr.get_active_version, backend)
-            info = await run_blocking(kernel_mgr.get_installed_version_info, backend)
-            
-            results[backend] = {
-                "versions": versions,
-                "current": current_active,
-                "installed_version": info.get("version"),
-                "latest_version": info.get("latest_version"),
-                "update_available": info.get("update_available")
-            }
-        except Exception as e:
-            logger.error(f"Error getting info for {backend}: {e}")
-            results[backend] = {"error": str(e)}
-            
+
+    fetched = await asyncio.gather(
+        *(_fetch_backend_versions(backend) for backend in backends),
+        return_exceptions=True,
+    )
+    for backend, result in zip(backends, fetched):
+        if isinstance(result, Exception):
+            logger.error(f"Error getting info for {backend}: {result}")
+            results[backend] = {"error": str(result)}
+            continue
+
+        versions, current_active, info = result
+        results[backend] = {
+            "versions": versions,
+            "current": current_active,
+            "installed_version": info.get("version"),
+            "latest_version": info.get("latest_version"),
+            "update_available": info.get("update_available")
+        }
+
     return results
 
 @router.post("/check-update")
-async def check_update(request: dict, user: str = Depends(auth_handler.get_current_user)):
+async def check_update(request: BackendRequest):
     """Manually check for updates"""
-    backend = request.get("backend", "usque")
+    backend = request.backend
     logger.info(f"Checking for updates for {backend}...")
     
-    latest = await run_blocking(kernel_mgr.check_for_updates, backend)
+    latest = await kernel_mgr.check_for_updates_async(backend)
     
     if latest:
         return {"success": True, "latest_version": latest}
     return {"success": False, "message": "No update found or check failed"}
 
 @router.post("/update")
-async def perform_update(request: dict, user: str = Depends(auth_handler.get_current_user)):
+async def perform_update(request: BackendRequest):
     """Perform update to latest version"""
-    backend = request.get("backend", "usque")
+    backend = request.backend
     
     logger.info(f"Triggering manual update for {backend}...")
-    updated = await run_blocking(kernel_mgr.auto_update, backend)
+    updated = await run_kernel_io(kernel_mgr.auto_update, backend)
     
     if updated:
          # Restart if successful
          controller = WarpController.get_instance()
          await controller.disconnect()
-         await asyncio.sleep(1)
+         await controller.wait_for_status("disconnected", timeout=1)
          await controller.connect()
          return {"success": True, "message": "Updated and restarted"}
     else:
          return {"success": False, "message": "Update failed or already up to date"}
 
 @router.post("/version")
-async def set_kernel_version(request: dict, user: str = Depends(auth_handler.get_current_user)):
+async def set_kernel_version(request: VersionRequest):
     """Set the active version for a backend"""
-    backend = request.get("backend")
-    version = request.get("version")
-    
-    if not backend or not version:
-        raise HTTPException(status_code=400, detail="Missing backend or version")
-    
-    success = await run_blocking(kernel_mgr.set_active_version, backend, version)
+    backend = request.backend
+    version = request.version
+
+    success = await run_kernel_io(kernel_mgr.set_active_version, backend, version)
     
     if not success:
         raise HTTPException(status_code=400, detail="Failed to set version (invalid version or backend)")
@@ -112,7 +120,7 @@ async def set_kernel_version(request: dict, user: str = Depends(auth_handler.get
         logger.info(f"Version changed for active backend {backend}, restarting...")
         controller = WarpController.get_instance()
         await controller.disconnect()
-        await asyncio.sleep(1)
+        await controller.wait_for_status("disconnected", timeout=1)
         await controller.connect()
         
     return {
@@ -3,14 +3,16 @@ from ..controllers.auth_controller import AuthHandler
 from ..controllers.warp_controller import WarpController
 from ..utils.version import get_app_version
 from ..utils.logger import log_collector
+import itertools
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 auth_handler = AuthHandler.get_instance()
+get_current_user = auth_handler.get_current_user
 
 @router.get("/status")
-async def get_status(user: str = Depends(auth_handler.get_current_user)):
+async def get_status(user: str = Depends(get_current_user)):
     return await WarpController.get_instance().get_status()
 
 @router.get("/version")
@@ -19,13 +21,17 @@ async def get_version():
     return {"version": get_app_version()}
 
 @router.get("/logs")
-async def get_logs(limit: int = 100, user: str = Depends(auth_handler.get_current_user)):
+async def get_logs(limit: int = 100, user: str = Depends(get_current_user)):
     """
     Get recent logs. 
     """
-    logs = list(log_collector.logs)
-            
+    # deque.copy() is a single C call, so emit() from worker threads can't
+    # mutate the deque halfway through our iteration
+    logs = log_collector.logs.copy()
+    total = len(logs)
+    start = max(0, total - limit) if limit > 0 else 0
+
     return {
-        "total": len(logs),
-        "logs": logs[-limit:]
+        "total": total,
+        "logs": list(itertools.islice(logs, start, total))
     }
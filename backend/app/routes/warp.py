@@ -1,36 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Literal
 from ..controllers.auth_controller import AuthHandler
 from ..controllers.warp_controller import WarpController
 import logging
-import asyncio
 
-router = APIRouter()
 logger = logging.getLogger(__name__)
 auth_handler = AuthHandler.get_instance()
+get_current_user = auth_handler.get_current_user
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+class SwitchBackendRequest(BaseModel):
+    backend: Literal["usque", "official"]
 
 @router.get("/backend/current")
-async def get_current_backend(user: str = Depends(auth_handler.get_current_user)):
+async def get_current_backend():
     """Get current backend type"""
     controller = WarpController.get_instance()
     backend = WarpController.get_current_backend()
-    
-    is_connected = False
-    if hasattr(controller, 'is_connected'):
-        is_connected = await controller.is_connected()
-        
+    is_connected = await controller.is_connected_cached()
+
     return {
         "backend": backend,
         "connected": is_connected
     }
 
 @router.post("/backend/switch")
-async def switch_backend(request: dict, user: str = Depends(auth_handler.get_current_user)):
+async def switch_backend(request: SwitchBackendRequest):
     """Switch WARP backend"""
-    new_backend = request.get("backend")
-    
-    if new_backend not in ["usque", "official"]:
-        raise HTTPException(status_code=400, detail="Invalid backend. Use 'usque' or 'official'")
-    
+    new_backend = request.backend
+
     previous_backend = WarpController.get_current_backend()
     # previous_mode = WarpController.get_current_mode()
     
@@ -59,7 +58,7 @@ async def switch_backend(request: dict, user: str = Depends(auth_handler.get_cur
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/connect")
-async def connect(user: str = Depends(auth_handler.get_current_user)):
+async def connect():
     controller = WarpController.get_instance()
     success = await controller.connect()
     if not success:
@@ -67,7 +66,7 @@ async def connect(user: str = Depends(auth_handler.get_current_user)):
     return await controller.get_status()
 
 @router.post("/disconnect")
-async def disconnect(user: str = Depends(auth_handler.get_current_user)):
+async def disconnect():
     controller = WarpController.get_instance()
     success = await controller.disconnect()
     if not success:
@@ -75,21 +74,14 @@ async def disconnect(user: str = Depends(auth_handler.get_current_user)):
     return await controller.get_status()
 
 @router.post("/rotate")
-async def rotate_ip(user: str = Depends(auth_handler.get_current_user)):
+async def rotate_ip():
     """
     轮换 IP 地址（简单模式：断开重连）
     """
     controller = WarpController.get_instance()
-    
-    # Use built-in rotate if available
-    if hasattr(controller, 'rotate_ip_simple'):
-        success = await controller.rotate_ip_simple()
-    else:
-        # Fallback manual rotation
-        await controller.disconnect()
-        await asyncio.sleep(1)
-        success = await controller.connect()
-    
+    # Every controller inherits rotate_ip_simple from WarpBackendController
+    success = await controller.rotate_ip_simple()
+
     if not success:
         raise HTTPException(status_code=500, detail="Failed to rotate (reconnect failed)")
     
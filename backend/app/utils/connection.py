@@ -1,13 +1,18 @@
 from fastapi import WebSocket
+import asyncio
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
 class ConnectionManager:
     _instance = None
+    # A client that can't take a frame within this long is treated as dead
+    _SEND_TIMEOUT = 0.5
     
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
+        self._closing: set[asyncio.Task] = set()  # Pending closes of dropped clients
 
     @classmethod
     def get_instance(cls):
@@ -17,23 +22,45 @@ class ConnectionManager:
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
 
     async def broadcast(self, message: dict):
-        dead_connections = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                dead_connections.append(connection)
-        
+        # Fan out concurrently so one slow client doesn't hold up the rest
+        connections = list(self.active_connections)
+        if not connections:
+            return
+        # Encode once for every client; sent as text because the frontend JSON.parses event.data
+        payload = orjson.dumps(message).decode()
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_text(payload), self._SEND_TIMEOUT) for connection in connections),
+            return_exceptions=True,
+        )
+        dead_connections = [
+            conn for conn, result in zip(connections, results) if isinstance(result, Exception)
+        ]
+
         # Clean up broken connections
-        for conn in dead_connections:
-            if conn in self.active_connections:
-                self.active_connections.remove(conn)
+        if dead_connections:
+            self.active_connections.difference_update(dead_connections)
+            # Close them too, otherwise a merely slow client sits in receive_text()
+            # forever and its frontend never gets onclose to reconnect
+            for conn in dead_connections:
+                task = asyncio.create_task(self._close(conn))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            # No short timeout here: the server's close handshake timeout aborts the TCP connection
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+    async def broadcast_ping(self):
+        """Keep-alive for idle clients; dead sockets are pruned by broadcast"""
+        await self.broadcast({"type": "ping"})
 
 manager = ConnectionManager.get_instance()
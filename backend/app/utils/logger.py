@@ -1,20 +1,30 @@
 import logging
 import asyncio
+import re
 from collections import deque
 from datetime import datetime
 
+_CONN_NOISE_RE = re.compile(r"connection (?:open|closed)")
+
 # Filter for noisy connection logs
 class ConnectionFilter(logging.Filter):
     def filter(self, record):
-        msg = record.getMessage()
-        return "connection open" not in msg and "connection closed" not in msg
+        msg = record.msg
+        if not isinstance(msg, str) or record.args:
+            # Text may come from the args; format only in this case
+            msg = record.getMessage()
+        elif "connection" not in msg:
+            return True
+        return _CONN_NOISE_RE.search(msg) is None
 
 # Custom handler
 class LogCollector(logging.Handler):
     def __init__(self, maxlen=100):
         super().__init__()
         self.logs = deque(maxlen=maxlen)
-        self._pending_logs: deque = deque(maxlen=maxlen)
+        # Entries ever appended / already broadcast; the unsent ones are the tail of self.logs
+        self._seq = 0
+        self._last_sent = 0
         self.formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%H:%M:%S'
@@ -44,7 +54,7 @@ class LogCollector(logging.Handler):
             'message': msg
         }
         self.logs.append(log_entry)
-        self._pending_logs.append(log_entry)
+        self._seq += 1
         
         # Schedule a single flush instead of one task per log line
         if not self._flush_scheduled:
@@ -66,9 +76,17 @@ class LogCollector(logging.Handler):
         # We need a way to broadcast. Ideally via clarity of dependency injection or a global event bus.
         # For now, we will rely on a global manager set by main.py
         if hasattr(self, 'manager') and self.manager:
-             while self._pending_logs:
-                entry = self._pending_logs.popleft()
-                await self.manager.broadcast({'type': 'log', 'data': entry})
+            # One frame per debounce window instead of one per log line
+            # emit() runs under self.lock (Handler.handle) on any thread; snapshot the
+            # counter and the deque together so an append in between isn't lost
+            with self.lock:
+                seq = self._seq
+                logs = self.logs.copy()
+            pending = min(seq - self._last_sent, len(logs))
+            self._last_sent = seq
+            if pending > 0:
+                batch = list(logs)[-pending:]
+                await self.manager.broadcast({'type': 'logs', 'data': batch})
 
 # Global instance
 log_collector = LogCollector(maxlen=200)
@@ -0,0 +1,171 @@
+import asyncio
+import http.client
+import logging
+import os
+import socket
+import threading
+import xmlrpc.client
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUPERVISOR_SOCKET = os.getenv("SUPERVISOR_SOCKET", "/var/run/supervisor.sock")
+
+# supervisor.xmlrpc.Faults codes we treat as "nothing to do"
+_FAULT_NOT_RUNNING = 70
+_FAULT_ALREADY_STARTED = 60
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = 30):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._path)
+        self.sock = sock
+
+
+class _UnixStreamTransport(xmlrpc.client.Transport):
+    """XML-RPC transport over supervisord's unix socket (keeps the connection alive)"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._path = path
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        self._connection = host, _UnixHTTPConnection(self._path)
+        return self._connection[1]
+
+
+class SupervisorClient:
+    """
+    Persistent XML-RPC client for supervisord.
+    Mirrors the supervisorctl subcommands the controllers use and returns
+    (rc, output) like a supervisorctl invocation would.
+    """
+    _instance = None
+
+    def __init__(self, socket_path: str = SUPERVISOR_SOCKET):
+        self.socket_path = socket_path
+        # ServerProxy/Transport are not thread-safe; each worker thread keeps its own
+        # connection so concurrent calls (e.g. stopping two programs) don't queue up
+        self._local = threading.local()
+        # Socket seen once; re-checked only after a connection error
+        self._socket_seen = False
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = SupervisorClient()
+        return cls._instance
+
+    @property
+    def _proxy(self) -> xmlrpc.client.ServerProxy:
+        proxy = getattr(self._local, "proxy", None)
+        if proxy is None:
+            proxy = xmlrpc.client.ServerProxy(
+                "http://localhost/RPC2", transport=_UnixStreamTransport(self.socket_path)
+            )
+            self._local.proxy = proxy
+        return proxy
+
+    @property
+    def available(self) -> bool:
+        if not self._socket_seen:
+            self._socket_seen = os.path.exists(self.socket_path)
+        return self._socket_seen
+
+    async def call(self, action: str, name: Optional[str] = None) -> Tuple[int, str]:
+        """Run a supervisorctl-style action: start, stop, restart, status, reread, update"""
+        return await asyncio.to_thread(self._call_sync, action, name)
+
+    def _call_sync(self, action: str, name: Optional[str]) -> Tuple[int, str]:
+        try:
+            if action == "start":
+                return self._ignore_fault(self._proxy.supervisor.startProcess, name, _FAULT_ALREADY_STARTED)
+            if action == "stop":
+                return self._ignore_fault(self._proxy.supervisor.stopProcess, name, _FAULT_NOT_RUNNING)
+            if action == "restart":
+                return self._restart(name)
+            if action == "status":
+                info = self._proxy.supervisor.getProcessInfo(name)
+                state = info.get("statename", "UNKNOWN")
+                return (0 if state == "RUNNING" else 3), f"{name} {state}"
+            if action == "reread":
+                self._proxy.supervisor.reloadConfig()
+                return 0, ""
+            if action == "update":
+                return self._update()
+            raise ValueError(f"Unsupported supervisor action: {action}")
+        except xmlrpc.client.Fault as e:
+            return 1, f"ERROR ({e.faultString})"
+        except (OSError, http.client.HTTPException, xmlrpc.client.Error) as e:
+            # Transport/protocol failure or a malformed reply (Faults are handled above);
+            # drop the cached connection so the next call reconnects
+            self._proxy("close")()
+            self._socket_seen = False
+            return -1, str(e)
+
+    @staticmethod
+    def _ignore_fault(func, name: str, ok_code: int) -> Tuple[int, str]:
+        try:
+            func(name)
+        except xmlrpc.client.Fault as e:
+            if e.faultCode != ok_code:
+                raise
+        return 0, ""
+
+    def _multicall(self, calls: List[Tuple[str, list]]) -> list:
+        """
+        Run calls in order via one system.multicall. Failed calls come back as
+        xmlrpc.client.Fault instances. supervisord returns successful results
+        unwrapped (not as one-element lists), so xmlrpc.client.MultiCall can't parse its replies.
+        """
+        results = self._proxy.system.multicall(
+            [{"methodName": method, "params": params} for method, params in calls]
+        )
+        if not isinstance(results, list) or len(results) != len(calls):
+            raise xmlrpc.client.ResponseError(f"unexpected multicall result: {results!r}")
+        return [
+            xmlrpc.client.Fault(r["faultCode"], r.get("faultString", ""))
+            if isinstance(r, dict) and "faultCode" in r else r
+            for r in results
+        ]
+
+    def _restart(self, name: str) -> Tuple[int, str]:
+        """stop + start in one system.multicall; stopProcess waits for the exit before start runs"""
+        results = self._multicall([
+            ("supervisor.stopProcess", [name]),
+            ("supervisor.startProcess", [name]),
+        ])
+        for result, ok_code in zip(results, (_FAULT_NOT_RUNNING, _FAULT_ALREADY_STARTED)):
+            if isinstance(result, xmlrpc.client.Fault) and result.faultCode != ok_code:
+                raise result
+        return 0, ""
+
+    def _update(self) -> Tuple[int, str]:
+        """
+        Equivalent of `supervisorctl update`: apply added/changed/removed groups.
+        The group operations go out as one system.multicall (executed in order).
+        """
+        added, changed, removed = self._proxy.supervisor.reloadConfig()[0]
+        if not (added or changed or removed):
+            return 0, ""
+
+        calls = []
+        for group in removed + changed:
+            calls.append(("supervisor.stopProcessGroup", [group]))
+            calls.append(("supervisor.removeProcessGroup", [group]))
+        for group in changed + added:
+            calls.append(("supervisor.addProcessGroup", [group]))
+
+        for (method, _), result in zip(calls, self._multicall(calls)):
+            if isinstance(result, xmlrpc.client.Fault):
+                if not (method == "supervisor.stopProcessGroup" and result.faultCode == _FAULT_NOT_RUNNING):
+                    raise result
+        return 0, ""
@@ -1,16 +1,22 @@
 import os
 
-def get_app_version():
-    """Reads the application version from the VERSION file in the project root."""
+# Assuming VERSION file is in the project root (d:\Projects\warp-panel\VERSION)
+# and this file is in d:\Projects\warp-panel\backend\app\utils
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+_VERSION_FILE = os.path.join(_BASE_DIR, 'VERSION')
+
+
+def _read_version():
     try:
-        # Assuming VERSION file is in the project root (d:\Projects\warp-panel\VERSION)
-        # and this file is in d:\Projects\warp-panel\backend\app\utils
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-        version_file = os.path.join(base_dir, 'VERSION')
-        
-        if os.path.exists(version_file):
-            with open(version_file, 'r') as f:
-                return f.read().strip()
-        return "Unknown"
+        with open(_VERSION_FILE, 'r') as f:
+            return f.read().strip()
     except Exception:
         return "Unknown"
+
+
+# VERSION doesn't change while the process runs
+_APP_VERSION = _read_version()
+
+def get_app_version():
+    """Returns the application version read from the VERSION file in the project root."""
+    return _APP_VERSION